@@ -0,0 +1,147 @@
+import numpy as np
+
+from itertools import chain
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, \
+    TfidfTransformer
+from typing import Iterator, Union, List
+
+from spider import Spider, stem_counts
+
+class HashingTfidf(object):
+    """Hashed Term Frequency - Inverse Document Frequency
+
+    Alternative to `Tfidf` that hashes every token straight to a fixed column
+    position instead of building a vocabulary. No term index, position dict or
+    per-token lookups are needed, and documents can be added without knowing
+    the corpus vocabulary up front.
+    """
+
+    def __init__(
+        self,
+        spider:Spider,
+        index_documents:str ='same',
+        new_documents:Union[dict, None] = None,
+        n_features:int = 2**18
+    ) -> None:
+        """Constructor for HashingTfidf
+
+        Args:
+            spider (Spider): Spider object whose stemmer, stopwords and
+                crawled corpus are used.
+            index_documents (str, optional): Three options:
+                - same: spider corpus will serve as documents to be indexed
+                - new: parameter `new_documents` will serve as documents to be
+                    indexed
+                - add: in addition to the spider corpus `new_documents` will
+                    serve as documents to be indexed
+                Defaults to 'same'.
+            new_documents (Union[dict, None], optional): In case
+                `index_documents` is set to 'new' or to 'add' `new_documents'
+                will be used for documents to be indexed. Defaults to None.
+            n_features (int, optional): Number of hash columns. Defaults to
+                2**18.
+
+        Raises:
+            Exception: Raised if index_documents is unknown.
+        """
+        self.spider = spider
+        self.doc_keys = []
+        self.vectorizer = HashingVectorizer(n_features=n_features,
+            analyzer=self._analyze, alternate_sign=False, norm=None)
+        self.transformer = TfidfTransformer()
+
+        if index_documents == 'same':
+            content = spider.iter_documents()
+        elif index_documents == 'new':
+            content = new_documents.items()
+        elif index_documents == 'add':
+            content = chain(spider.iter_documents(), new_documents.items())
+        else:
+            raise Exception(f'Unknown input for index_documents:'
+                f'{index_documents}.')
+
+        # peek at the stream first: the vectorizer chokes on an exhausted
+        # generator, and an empty corpus should still construct
+        content = iter(content)
+        first = next(content, None)
+        if first is None:
+            self.doc_matrix = sparse.csr_matrix((0, n_features))
+            return
+
+        # the transformer normalizes every row to unit length, so the dot
+        # products computed in search are cosine similarities
+        term_counts = self.vectorizer.transform(
+            self._iter_texts(chain([first], content)))
+        self.doc_matrix = self.transformer.fit_transform(term_counts)
+
+    def _iter_texts(self, content) -> Iterator[str]:
+        """Yields the document texts while recording their names
+
+        Args:
+            content: Iterable of (document name, content of the document)
+                pairs.
+
+        Yields:
+            str: Content of the document.
+        """
+        for key, value in content:
+            self.doc_keys.append(key)
+            yield value
+
+    def _analyze(self, text:str) -> List[str]:
+        """Analyzer handed to the vectorizer
+
+        Tokenizes and stems `text` with the same pipeline the spider uses, so
+        searches match the indexed documents.
+
+        Args:
+            text (str): Text could be a single word, sentence or paragraph.
+
+        Returns:
+            List[str]: Stemmed tokens.
+        """
+        return list(stem_counts(text, self.spider.stem,
+            self.spider.stopwords).elements())
+
+    def search(self, search_text:str, verbose:bool=True) -> str:
+        """Searches the documents for a best match considering a search text
+
+        The search text is hashed into a word vector and compared to all
+        documents with a single sparse matrix-vector product.
+
+        Args:
+            search_text (str): Text for which the most similar document is to
+                be search for.
+            verbose (bool, optional): If True, intermediate results will be
+                printed. Defaults to True.
+
+        Returns:
+            str: Name of the document that matches the search string the best
+                regarding the highest similarity score.
+        """
+        if not self.doc_keys:
+            return 'no document found'
+
+        search_text_vector = self.transformer.transform(
+            self.vectorizer.transform([search_text]))
+
+        scores = self.doc_matrix.dot(search_text_vector.T).toarray().ravel()
+        if verbose:
+            for key, score in zip(self.doc_keys, scores):
+                print(f'{score:.5f} for doc {key}')
+
+        best_match = int(np.argmax(scores))
+        best_match_document = self.doc_keys[best_match]
+        if verbose:
+            print(f'closest doc is {best_match_document} with score '
+                f'{scores[best_match]}')
+        return best_match_document
+
+    def __str__(self) -> str:
+        """String representer for HashingTfidf objects
+
+        Returns:
+            str: Concatenated list of all document names.
+        """
+        return ', '.join(self.doc_keys)
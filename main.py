@@ -3,10 +3,13 @@ from spider import Spider
 
 import nltk
 
-spider = Spider(corpus='data', file_type='txt', language='german') 
-spider.crawl()
-spider.generate_term_index(additional_terms='CPU\nGPU\nStift\nGNU General Public License\nhäufig'.split('\n'))
+# guard against re-execution when multiprocessing workers import __main__
+# on spawn-based platforms
+if __name__ == '__main__':
+    spider = Spider(corpus='data', file_type='txt', language='german')
+    spider.crawl()
+    spider.generate_term_index(additional_terms='CPU\nGPU\nStift\nGNU General Public License\nhäufig'.split('\n'))
 
-tfidf = Tfidf(spider=spider, new_documents=spider.content, index_documents='overwrite')
-print(tfidf)
-print(tfidf.search('Ich unterstütze einige Typisierungen'))
\ No newline at end of file
+    tfidf = Tfidf(spider=spider, index_documents='same')
+    print(tfidf)
+    print(tfidf.search('Ich unterstütze einige Typisierungen'))
@@ -1,10 +1,103 @@
 import os
+import re
+import threading
 
 from bs4 import BeautifulSoup
-from nltk import word_tokenize
+from collections import Counter
+from lxml import etree
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from nltk.corpus import stopwords
 from nltk.stem.snowball import GermanStemmer, EnglishStemmer
-from typing import Union, List, Dict, Tuple
+from typing import Iterator, Union, List, Dict, Tuple
+
+# Matches runs of letters only (including umlauts etc.), which is all the
+# stemmer needs and avoids the much slower sentence segmentation done by
+# nltk.word_tokenize.
+_TOKEN_RE = re.compile(r'[^\W\d_]+', re.UNICODE)
+
+def stem_counts(content:str, stem, stopwords) -> Counter:
+    """Stem Counts
+
+    Extracts the word-like tokens from `content` and counts them per stem.
+    Short tokens and stopwords are dropped. The raw tokens are counted first
+    (entirely in C inside Counter), so filtering and stemming only run once
+    per distinct surface form instead of once per occurrence.
+
+    Args:
+        content (str): Text to tokenize.
+        stem: Callable mapping a token to its stem.
+        stopwords: Set of stopwords to ignore.
+
+    Returns:
+        Counter: Frequency of every stemmed token.
+    """
+    raw_counts = Counter(_TOKEN_RE.findall(content.lower()))
+
+    counts = Counter()
+    for token, count in raw_counts.items():
+        if len(token)>1 and token not in stopwords:
+            counts[stem(token)] += count
+    return counts
+
+def parse_file(file_path:str, file_type:str) -> str:
+    """Parse File
+
+    Extracts text from the file. If the file type is 'html', only content of
+    paragraphs will be used. Lives at module level so it can be pickled into
+    worker processes.
+
+    Args:
+        file_path (str): Path to the file.
+        file_type (str): The type of the file, either 'txt' or 'html'.
+
+    Returns:
+        str: Text of the file.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = f.read()
+
+        if file_type == 'html':
+            try:
+                # lxml's C parser is several times faster than html.parser
+                tree = etree.HTML(data)
+                content = ''.join(text
+                    for text in tree.xpath('//p//text()') if text)
+            except Exception:
+                # fall back to the forgiving pure-Python parser
+                parser = BeautifulSoup(data,'html.parser')
+                content = ''.join(p.text for p in parser.find_all('p')
+                    if p.text)
+        else:
+            content = data
+
+        return content
+    except Exception as e:
+        print(f'error during parsing with {file_path} -> {e}')
+
+def _readahead(file_paths:List[str]) -> None:
+    """Readahead
+
+    Asks the kernel to prefetch the given files into the page cache, so the
+    reads issued by the parsers later hit the cache instead of seeking. The
+    paths are expected to already be in inode order (see `Spider.crawl`).
+    Does nothing on platforms without posix_fadvise.
+
+    Args:
+        file_paths (List[str]): Paths of the files to prefetch.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for file_path in file_paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
 
 class Spider(object):
     """Spider
@@ -25,10 +118,12 @@ class Spider(object):
         """           
         self.corpus = corpus
         self.file_type = file_type
-        self.content = {}
-        self.term_index = {}
+        self.paths = []
+        self.term_index = Counter()
+        self.doc_freq = Counter()
+        self.n_docs = 0
         
-        self.stopwords=stopwords.words(language)
+        self.stopwords=frozenset(stopwords.words(language))
         self.language=language
         if language == 'german':
             self.stemmer=GermanStemmer()
@@ -36,29 +131,58 @@ class Spider(object):
             self.stemmer=EnglishStemmer()
         else:
             Exception(f'Unknown language {language}')
+        # Stemming is by far the most expensive step per token, so every
+        # distinct surface form is only stemmed once. The cache is bounded,
+        # but thanks to the Zipf distribution of words the frequent forms
+        # stay resident and the hit rate approaches one after a few documents.
+        self.stem=lru_cache(maxsize=131072)(self.stemmer.stem)
         
     def crawl(self, limit:Union[None, int]=None) -> None:
         """Crawl all files
 
-        Crawls all files inside the corpus folder which contain a specific file
-        type.
+        Crawls all files inside the corpus folder which contain a specific
+        file type and records their paths. The texts themselves are not kept
+        in memory; they are parsed on demand by `iter_documents`.
 
         Args:
             limit (Union[None, int], optional): Number of files to crawl. If
                 None all files will be crawled. Defaults to None.
         """
-        counter = 0
+        file_paths = []
         for root, dirs, files in os.walk(self.corpus):
             for file in files:
                 if file.endswith(f'.{self.file_type}'):
+                    file_paths.append(os.path.join(root, file))
+        if limit is not None:
+            file_paths = file_paths[:limit]
+
+        # visit files in inode order, which approximates their on-disk
+        # layout; on rotating disks this avoids seeking per file
+        file_paths.sort(key=lambda p: os.stat(p).st_ino)
+
+        self.paths = file_paths
+
+    def iter_documents(self) -> Iterator[Tuple[str, str]]:
+        """Iterate Documents
+
+        Parses the crawled files one after another so consumers can process a
+        document and let its text be garbage collected before the next one is
+        materialized. Parsing fans out across worker processes and the files
+        are prefetched in the background, so the stream stays CPU bound.
 
-                    file_path = os.path.join(root, file)
-                    
-                    self.content[file_path] = self.parse(file_path)
+        Yields:
+            Tuple[str, str]: Path of the file and its text.
+        """
+        # prefetch in the background while the parsers work through the list
+        threading.Thread(target=_readahead, args=(self.paths,),
+            daemon=True).start()
 
-                    counter += 1
-                    if limit is not None and counter >= limit:
-                        return 
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            contents = executor.map(
+                partial(parse_file, file_type=self.file_type),
+                self.paths, chunksize=32)
+            for file_path, content in zip(self.paths, contents):
+                yield file_path, content
 
     def parse(self, file_path:str) -> str:
         """Parse
@@ -72,24 +196,7 @@ class Spider(object):
         Returns:
             str: Text of the file.
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = f.read()
-            
-            if self.file_type == 'html':
-                parser = BeautifulSoup(data,'html.parser')
-                paragraphs = parser.find_all('p')   
-                content=''
-                for p in paragraphs:
-                    text=p.text
-                    if text is not None and len(text)>0:
-                        content+=text             
-            else:
-                content = data
-
-            return content
-        except Exception as e:       
-            print(f'error during parsing with {file_path} -> {e}')
+        return parse_file(file_path, self.file_type)
 
     def generate_term_index(self,
         additional_terms:Union[None, List[str]]=None) -> None:
@@ -105,7 +212,7 @@ class Spider(object):
         """
         self.clear_index()
 
-        for _, content in self.content.items():
+        for _, content in self.iter_documents():
             self.add_new_token(content, count_value=1)
                
         if additional_terms is not None:
@@ -119,6 +226,10 @@ class Spider(object):
         `term_index`. If a token is new to the `term_index`, it will receive a
         frequency of 1, otherwise the frequency is increased by `count_value`.
 
+        The `content` also counts as one document for the document frequency
+        `doc_freq`, unless `count_value` is zero; additional terms then only
+        receive a document frequency of 1 if they are not part of the corpus.
+
         Args:
             content (str): Text containing the terms to add.
             count_value (int, optional): Value used to increase the frequency
@@ -126,20 +237,32 @@ class Spider(object):
                 initial corpus to prevent increasing the frequency of
                 additional terms. Defaults to 1.
         """
-        tokens = word_tokenize(content, language=self.language)
-        for token in tokens:
-            # Ignore paranthesis, commas, points etc.
-            if len(token)>1 and token not in self.stopwords:
-                token=self.stemmer.stem(token)
-                if token not in self.term_index:                
-                    self.term_index[token]=1
-                else:
-                    self.term_index[token]+=count_value
+        counts = stem_counts(content, self.stem, self.stopwords)
+
+        if count_value:
+            self.n_docs += 1
+            self.doc_freq.update(counts.keys())
+        else:
+            for token in counts.keys() - self.doc_freq.keys():
+                self.doc_freq[token] = 1
+
+        if count_value == 1:
+            # new and existing tokens alike gain their full count, so the
+            # merge can run entirely inside Counter's C implementation
+            self.term_index.update(counts)
+        else:
+            new_tokens = counts.keys() - self.term_index.keys()
+            for token in counts.keys() - new_tokens:
+                self.term_index[token] += count_value*counts[token]
+            for token in new_tokens:
+                self.term_index[token] = 1 + count_value*(counts[token]-1)
 
     def clear_index(self) -> None:
         """Clear Term Index
         """
-        self.term_index = {}
+        self.term_index = Counter()
+        self.doc_freq = Counter()
+        self.n_docs = 0
 
     def get_index_dictionary(self, sort:bool=False) -> Dict[str, int]:
         """Retrieve Term Index as Dictionary
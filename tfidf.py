@@ -1,10 +1,10 @@
-import math
 import numpy as np
 
-from itertools import compress
-from typing import Union, List
+from itertools import chain
+from scipy import sparse
+from typing import Iterable, Tuple, Union, List
 
-from spider import Spider
+from spider import Spider, stem_counts
 
 class Tfidf(object):
     """Term Frequency - Inverse Document Frequency
@@ -38,20 +38,23 @@ class Tfidf(object):
         """
 
         self.spider = spider
-        self.idf = {}
+        self.idf_arr = None
         self.indexed_documents = {}
+        self.doc_keys = []
+        self.doc_matrix = None
         self.word_vector = []
+        self.word_to_pos = {}
         
         self.init_term_frequency()
 
+        # stream the sources instead of materializing {path: text} dicts;
+        # each text is vectorized and then released
         if index_documents == 'same':
-            content = spider.content.copy()
+            content = spider.iter_documents()
         elif index_documents == 'new':
-            content = new_documents
+            content = new_documents.items()
         elif index_documents == 'add':
-            # files
-            content = spider.content.copy()
-            content.update(new_documents)
+            content = chain(spider.iter_documents(), new_documents.items())
         else:
             raise Exception(f'Unknown input for index_documents:'
                 f'{index_documents}.')
@@ -61,31 +64,54 @@ class Tfidf(object):
     def init_term_frequency(self) -> None:
         """Initialize term frequency
 
-        Every idf value for each term of spiders index is calculated and stored.
+        Every idf value for each term of spiders index is calculated as
+        log(number of documents / document frequency) and stored in an array
+        aligned with `word_vector`, so vector construction can index it
+        positionally.
         """
         term_index = self.spider.get_index_dictionary(sort=True)
-        
-        total_count = sum(term_index.values())
+
         self.word_vector = list(term_index.keys())
-        
-        for word in self.word_vector:
-            self.idf[word] = math.log(total_count/term_index[word])
+        self.word_to_pos = {word: position
+            for position, word in enumerate(self.word_vector)}
+
+        document_frequencies = np.array([self.spider.doc_freq[word]
+            for word in self.word_vector], dtype=np.float32)
+        # with no corpus documents the vocabulary can still be non-empty
+        # (additional terms); treat it as one document so the idf values
+        # stay finite instead of -inf
+        n_docs = max(self.spider.n_docs, 1)
+        self.idf_arr = np.log(n_docs/document_frequencies)
 
-    def insert_documents(self, content:dict) -> None:
+    def insert_documents(self,
+        content:Iterable[Tuple[str, str]]) -> None:
         """Inserting new documents that will be used as indexed documents
 
         A word vector is calculated and stored for each document of `content`.
+        The vectors are additionally stacked into a single matrix so that
+        `search` can compare against all documents in one operation.
 
         Args:
-            content (dict):
-                - key: document name
-                - value: content of the document
+            content: Iterable of (document name, content of the document)
+                pairs.
         """
-        for key, value in content.items():
+        for key, value in content:
             document_word_vector = self.create_word_vector(text=value)
             self.indexed_documents[key] = document_word_vector
 
-    def create_word_vector(self, text:str) -> np.array:
+        # restack from all stored vectors so repeated calls keep the matrix
+        # and doc_keys in sync with indexed_documents
+        self.doc_keys = list(self.indexed_documents.keys())
+        if self.doc_keys:
+            self.doc_matrix = sparse.vstack(
+                [self.indexed_documents[key] for key in self.doc_keys])
+        else:
+            # vstack rejects an empty list; keep an empty matrix so search
+            # can still report that no document was found
+            self.doc_matrix = sparse.csr_matrix(
+                (0, len(self.word_vector)), dtype=np.float32)
+
+    def create_word_vector(self, text:str) -> sparse.csr_matrix:
         """Create a word vector for a specific text
 
         During the vectorization process it is checked whether every tokenized
@@ -93,30 +119,47 @@ class Tfidf(object):
         If so, the respective tfidf value is calculated and set. Otherwise, 0
         is set.
 
-        The tfidf value is obtained by multiplying the tf and id values.
+        The tfidf value is obtained by multiplying the tf and id values. Since
+        a text only touches a handful of vocabulary terms, the vector is stored
+        sparsely and only the non-zero entries are materialized. The vector is
+        normalized to unit length, so the dot product of two word vectors is
+        their cosine similarity.
 
         Args:
             text (str): Text could be a single word, sentence or paragraph.
 
         Returns:
-            np.array: Word vector.
+            sparse.csr_matrix: Word vector of shape (1, vocabulary size).
         """
-        new_spider = Spider(language=self.spider.language)
-        new_spider.add_new_token(text)
-        term_index = new_spider.get_index_dictionary()
+        term_index = stem_counts(text, self.spider.stem,
+            self.spider.stopwords)
         len_tokens = sum(term_index.values())
-        new_spider.clear_index()
 
         # create document word vector
-        document_word_vector = np.zeros(len(self.word_vector))
-        for token in term_index.keys():
-            if token in self.word_vector:
-                position = self.word_vector.index(token)
-                # penalty-or-booster * word rate
-                document_word_vector[position] = self.idf[token] \
-                    * (term_index[token]/len_tokens)
-        
-        return document_word_vector
+        cols = []
+        counts = []
+        for token, count in term_index.items():
+            position = self.word_to_pos.get(token)
+            if position is not None:
+                cols.append(position)
+                counts.append(count)
+
+        # penalty-or-booster * word rate, for all matched tokens at once
+        cols = np.array(cols, dtype=np.intp)
+        data = self.idf_arr[cols] \
+            * (np.array(counts, dtype=np.float32)/len_tokens)
+
+        # normalize to unit length once, so searches only need a dot product
+        norm = np.linalg.norm(data)
+        if norm > 0:
+            data /= norm
+
+        # float32 halves the memory traffic of searches compared to the
+        # float64 default; float16 would halve it again but scipy's sparse
+        # kernels have no half-precision support, and ranking does not need
+        # the extra precision anyway
+        return sparse.csr_matrix((data, ([0]*len(cols), cols)),
+            shape=(1, len(self.word_vector)), dtype=np.float32)
 
     def get_idf_for_token(self, token:str) -> float:
         """Returns idf value for specific token
@@ -127,28 +170,32 @@ class Tfidf(object):
         Returns:
             float: Idf value for the specific token.
         """
-        return self.idf[token]
+        return float(self.idf_arr[self.word_to_pos[token]])
         
-    def get_token_for_vector(self, word_vector:np.array) -> List[str]:
+    def get_token_for_vector(self,
+        word_vector:sparse.csr_matrix) -> List[str]:
         """Returns original word for a word vector
 
         Args:
-            word_vector (np.array): Word vector for specific text.
+            word_vector (sparse.csr_matrix): Word vector for specific text.
 
         Returns:
             List[str]: Recognized tokens based on the word vector.
         """
-        words = list(compress(self.word_vector, word_vector>0))
+        words = [self.word_vector[position] for position in word_vector.indices]
         return words
 
     def search(self, search_text:str, verbose:bool=True) -> str:
         """Searches the documents for a best match considering a search text
 
         First, the search text is converted to a word vector. Next, the search
-        text word vector is compared to the word vector of all stored documents.
-        
-        Euclidean distance:
-            d(p,q)^2 = (q_1 - p_1)^2 + (q_2 - p_2)^2 + ... + (q_n - p_n)^2
+        text word vector is compared to the word vector of all stored
+        documents. Since all vectors are normalized to unit length, a single
+        sparse matrix-vector product yields the cosine similarity to every
+        document.
+
+        Cosine similarity:
+            cos(p,q) = (p_1*q_1 + p_2*q_2 + ... + p_n*q_n) / (|p|*|q|)
 
         Args:
             search_text (str): Text for which the most similar document is to be
@@ -158,37 +205,63 @@ class Tfidf(object):
 
         Returns:
             str: Name of the document that matches the search string the best
-                regarding the highest euclidean distance.
+                regarding the highest similarity score.
         """
-        best_match_document = 'no document found'
-        best_match_distance = 100
-        
+        if not self.doc_keys:
+            return 'no document found'
+
         search_text_vector = self.create_word_vector(search_text)
         if verbose:
             print(f'text vector: {search_text_vector}')
             print(f'recognized tokens: '
                 f'{self.get_token_for_vector(search_text_vector)}')
-        
-        for key, value in self.indexed_documents.items():
-            # Euclidean distance
-            distance = np.linalg.norm(value-search_text_vector)
-            if verbose:
-                print(f'{distance:.5f} for doc {key}')
-            if distance<best_match_distance:
-                best_match_distance=distance
-                best_match_document=key
+
+        # cosine similarity against all documents at once
+        scores = self.doc_matrix.dot(search_text_vector.T).toarray().ravel()
+        if verbose:
+            for key, score in zip(self.doc_keys, scores):
+                print(f'{score:.5f} for doc {key}')
+
+        best_match = int(np.argmax(scores))
+        best_match_document = self.doc_keys[best_match]
         if verbose:
-            print(f'closest doc is {best_match_document} with distance '
-                f'{best_match_distance}')
+            print(f'closest doc is {best_match_document} with score '
+                f'{scores[best_match]}')
         return best_match_document
-        
+
+    def search_batch(self, search_texts:List[str]) -> List[str]:
+        """Searches the documents for the best match of several search texts
+
+        The query word vectors are stacked into a single matrix, so the
+        cosine similarities of all queries to all documents come out of one
+        sparse matrix-matrix product instead of one matrix-vector product per
+        query.
+
+        Args:
+            search_texts (List[str]): Texts for which the most similar
+                documents are to be searched for.
+
+        Returns:
+            List[str]: Name of the best matching document for each search
+                text, in the same order.
+        """
+        if not search_texts:
+            return []
+        if not self.doc_keys:
+            return ['no document found']*len(search_texts)
+
+        query_matrix = sparse.vstack(
+            [self.create_word_vector(text) for text in search_texts])
+
+        # queries in rows, documents in columns
+        scores = query_matrix.dot(self.doc_matrix.T).toarray()
+        best_matches = scores.argmax(axis=1)
+        return [self.doc_keys[int(best_match)] for best_match in best_matches]
+
     def __str__(self) -> str:
         """String representer for Tfidf objects
 
         Returns:
             str: Concatenated list of all document names.
         """
-        document_names = ''
-        for document_name in self.indexed_documents.keys():
-            document_names += f'{document_name}, '
-        return document_names[:-2]
\ No newline at end of file
+        return ', '.join(self.indexed_documents.keys())
\ No newline at end of file